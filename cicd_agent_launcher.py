@@ -5,13 +5,21 @@ Handles deployments to Dev, QA, and Stage environments using GitHub Actions
 """
 
 import os
+import re
+import functools
+import importlib.util
+import atexit
 import sys
 import time
 import json
+import shutil
 import subprocess
-import requests
-from datetime import datetime
+import hmac
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import logging
 
 # Configure logging
@@ -25,9 +33,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ISSUE_TEMPLATE = """
+## Environment
+{env_upper}
+
+## Issue Type
+{issue_type}
+
+## Root Cause
+{details}...
+
+## Steps to Reproduce
+1. Trigger deployment to {env} environment
+2. Monitor workflow execution
+3. Observe failure
+
+## Priority
+Medium
+
+## Labels
+bug, cicd, {env}
+"""
+
+def lazy_import(name):
+    """Return a module that is only loaded on first attribute access"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# orjson parses GitHub payloads several times faster; fall back to the stdlib
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# requests (and urllib3 beneath it) is only loaded once the first API call is made
+requests = lazy_import('requests')
+
+class WorkflowRunWebhookHandler(BaseHTTPRequestHandler):
+    """Receive signed GitHub workflow_run webhooks and wake the matching waiters"""
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        
+        expected = 'sha256=' + hmac.new(self.server.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, self.headers.get('X-Hub-Signature-256', '')):
+            self.send_response(401)
+            self.end_headers()
+            return
+            
+        try:
+            payload = json_loads(body)
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+            
+        # Only a wake-up signal: waiters re-fetch the run from the API themselves
+        run = payload.get('workflow_run') or {}
+        if payload.get('action') == 'completed':
+            with self.server.runs_changed:
+                if run.get('id') in self.server.waiting_runs:
+                    self.server.completed_runs.add(run['id'])
+                    self.server.runs_changed.notify_all()
+                
+        self.send_response(204)
+        self.end_headers()
+        
+    def log_message(self, format, *args):
+        logger.debug(f"Webhook: {format % args}")
+
+class FileCache:
+    """On-disk cache for immutable GitHub resources, shared across agent runs"""
+    
+    def __init__(self, directory):
+        self.dir = Path(directory).expanduser()
+        
+    def _path(self, key):
+        return self.dir / hashlib.sha256(key.encode()).hexdigest()
+        
+    def get(self, key, ttl=None):
+        """Return the cached JSON value for key, or None if missing or older than ttl"""
+        path = self._path(key)
+        try:
+            if ttl is not None and time.time() - path.stat().st_mtime >= ttl:
+                return None
+            return json_loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+            
+    def set(self, key, value):
+        """Store a JSON-serializable value under key, replacing it atomically"""
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            # Created on first write so an unwritable cache never stops the agent
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(value))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+
 class CICDAgent:
+    # Failure categories and their log keywords, in priority order
+    _CATEGORY_PATTERNS = [
+        ("test_failure", rb"test failure|assertion"),
+        ("dependency_error", rb"dependency|package"),
+        ("ci_misconfiguration", rb"configuration|yaml"),
+        ("code_defect", rb"\bcode\b|syntax"),
+    ]
+    _FAILURE_RE = re.compile(
+        b"|".join(b"(?P<%s>%s)" % (name.encode(), pattern) for name, pattern in _CATEGORY_PATTERNS),
+        re.I
+    )
+    _CATEGORY_RANK = {name: rank for rank, (name, _) in enumerate(_CATEGORY_PATTERNS)}
+    _LOG_CHUNK_SIZE = 64 * 1024
+    _LOG_TAIL_SIZE = 4 * 1024
+    _RUN_LOOKUP_TIMEOUT = 120
+    
     def __init__(self):
         self.environments = ['dev', 'qa', 'stage']
+        self._env_upper = {env: env.upper() for env in self.environments}
         self.max_retries = 10
         self.github_token = os.getenv('GITHUB_TOKEN')
         self.github_repo = os.getenv('GITHUB_REPOSITORY', 'MangoMetrics/NLM')
@@ -42,18 +176,113 @@ class CICDAgent:
             'Accept': 'application/vnd.github.v3+json'
         }
         
+        # Conditional-request cache of url -> (etag, data): 304 responses are free against the rate limit
+        self._etag_cache = {}
+        
+        # Optional event-driven completion via GitHub workflow_run webhooks
+        self.webhook_url = os.getenv('WEBHOOK_URL')
+        self.webhook_port = int(os.getenv('WEBHOOK_PORT', '8080'))
+        self.webhook_secret = os.getenv('WEBHOOK_SECRET')
+        if self.webhook_url and not self.webhook_secret:
+            logger.warning("WEBHOOK_URL is set but WEBHOOK_SECRET is not; falling back to polling")
+            self.webhook_url = None
+        self._webhook_server = None
+        self._webhook_lock = threading.Lock()
+        
+        # Completed runs and their failure analyses never change, so keep them on disk
+        self.cache = FileCache(os.getenv('CICD_CACHE_DIR', '~/.cicd_agent_cache'))
+        
+        # Branch SHAs keyed by branch name: (fetched_at, sha)
+        self._sha_cache = {}
+        
+        # Per-environment deployment log handles, flushed at environment boundaries
+        self._log_files = {}
+        atexit.register(self.close)
+        
+        # Worker pool for overlapping latency-bound API lookups
+        self._executor = ThreadPoolExecutor(max_workers=3 * len(self.environments))
+        
+        # Deploy all environments concurrently instead of dev -> qa -> stage
+        self.parallel = os.getenv('CICD_PARALLEL', 'false').lower() in ('1', 'true', 'yes')
+        
+    @functools.cached_property
+    def session(self):
+        """Shared session so every API call reuses pooled keep-alive connections"""
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        )
+        session.mount('https://', adapter)
+        return session
+        
     def log_deployment_attempt(self, env, attempt, status, details=""):
         """Log deployment attempt to file"""
-        log_file = f"deployment_log_{env}.md"
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        
+        f = self._log_files.get(env)
+        if f is None:
+            f = self._log_files[env] = open(f"deployment_log_{env}.md", 'a', buffering=65536)
+            
+        f.write(f"## Attempt {attempt} - {timestamp}\n")
+        f.write(f"**Status:** {status}\n")
+        if details:
+            f.write(f"**Details:** {details}\n")
+        f.write("\n---\n\n")
+        
+    def flush_deployment_log(self, env):
+        """Flush buffered deployment log entries for an environment"""
+        f = self._log_files.get(env)
+        if f is not None:
+            f.flush()
+            
+    def close(self):
+        """Close deployment log handles and release the worker pool"""
+        for f in self._log_files.values():
+            f.close()
+        self._log_files.clear()
+        self._executor.shutdown(wait=False)
         
-        with open(log_file, 'a') as f:
-            f.write(f"## Attempt {attempt} - {timestamp}\n")
-            f.write(f"**Status:** {status}\n")
-            if details:
-                f.write(f"**Details:** {details}\n")
-            f.write("\n---\n\n")
+    def _conditional_get(self, url):
+        """GET a JSON resource, reusing the cached body when GitHub answers 304"""
+        headers = {}
+        # Read the pair once so the body always matches the ETag it was sent with
+        cached = self._etag_cache.get(url)
+        if cached:
+            headers['If-None-Match'] = cached[0]
             
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304:
+            return cached[1]
+        response.raise_for_status()
+        
+        data = json_loads(response.content)
+        etag = response.headers.get('ETag')
+        if etag:
+            # One assignment, so concurrent lookups can't pair an ETag with another response's body
+            self._etag_cache[url] = (etag, data)
+        return data
+        
+    def _find_dispatched_run(self, runs_url, environment, known_ids, delay, found):
+        """Return the newest run for environment if it was not listed before the dispatch"""
+        # Skip the request entirely once an earlier lookup has found the run
+        if found.wait(delay):
+            return None
+        run_name = f"Deploy to {environment}"
+        for run in self._conditional_get(runs_url)['workflow_runs']:
+            if run.get('display_title') != run_name:
+                continue
+            if run['id'] not in known_ids:
+                found.set()
+                return run['id']
+            break
+        return None
+        
     def trigger_workflow(self, environment):
         """Trigger GitHub Actions workflow for specified environment"""
         workflow_file = "deploy-all-envs.yml"
@@ -78,46 +307,123 @@ class CICDAgent:
         }
         
         url = f"{self.github_api_url}/actions/workflows/{workflow_file}/dispatches"
+        runs_url = (f"{self.github_api_url}/actions/workflows/{workflow_file}/runs"
+                    f"?event=workflow_dispatch&branch=main&per_page=10")
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            # Runs listed before the dispatch can't be the one it creates
+            known_ids = {run['id'] for run in self._conditional_get(runs_url)['workflow_runs']}
+            response = self.session.post(url, json=payload)
             response.raise_for_status()
-            
-            # Get the workflow run ID
-            runs_url = f"{self.github_api_url}/actions/runs"
-            runs_response = requests.get(runs_url, headers=self.headers)
-            runs_response.raise_for_status()
-            
-            runs = runs_response.json()['workflow_runs']
-            if runs:
-                return runs[0]['id']
-            else:
-                logger.error("No workflow runs found")
-                return None
-                
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to trigger workflow: {e}")
             return None
             
+        # Get the workflow run ID with staggered lookups; the first hit wins
+        found = threading.Event()
+        lookups = [
+            self._executor.submit(self._find_dispatched_run, runs_url, environment, known_ids, delay, found)
+            for delay in (1, 3, 6)
+        ]
+        for lookup in as_completed(lookups):
+            try:
+                run_id = lookup.result()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Workflow run lookup failed: {e}")
+                continue
+            if run_id:
+                return run_id
+                
+        # The dispatch succeeded, so keep looking rather than dispatching again
+        deadline = time.monotonic() + self._RUN_LOOKUP_TIMEOUT
+        delay = 2
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 15)
+            try:
+                run_id = self._find_dispatched_run(runs_url, environment, known_ids, 0, found)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Workflow run lookup failed: {e}")
+                continue
+            if run_id:
+                return run_id
+                
+        logger.error(f"No workflow run for {environment} appeared within {self._RUN_LOOKUP_TIMEOUT} seconds")
+        return None
+            
+    def _start_webhook_listener(self):
+        """Start the workflow_run webhook listener on first use"""
+        # Parallel deployments reach their first wait together; only one may bind
+        with self._webhook_lock:
+            if self._webhook_server is None and self.webhook_url:
+                try:
+                    server = ThreadingHTTPServer(('', self.webhook_port), WorkflowRunWebhookHandler)
+                except OSError as e:
+                    logger.warning(f"Webhook listener unavailable, falling back to polling: {e}")
+                    self.webhook_url = None
+                    return None
+                    
+                server.webhook_secret = self.webhook_secret
+                server.waiting_runs = set()
+                server.completed_runs = set()
+                server.runs_changed = threading.Condition()
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                
+                self._webhook_server = server
+                logger.info(f"Listening for workflow_run webhooks on port {self.webhook_port} ({self.webhook_url})")
+            return self._webhook_server
+            
+    def webhook_wait(self, run_id, timeout):
+        """Block until a completion webhook arrives for run_id, or timeout; True if woken"""
+        server = self._start_webhook_listener()
+        if server is None:
+            time.sleep(timeout)
+            return False
+            
+        with server.runs_changed:
+            server.waiting_runs.add(run_id)
+            try:
+                return server.runs_changed.wait_for(lambda: run_id in server.completed_runs, timeout)
+            finally:
+                server.waiting_runs.discard(run_id)
+                server.completed_runs.discard(run_id)
+            
     def monitor_workflow(self, run_id):
         """Monitor workflow run status"""
         url = f"{self.github_api_url}/actions/runs/{run_id}"
+        iteration = 0
         
+        cache_key = f"{self.github_repo}/runs/{run_id}"
+        run_data = self.cache.get(cache_key)
+        if run_data:
+            logger.info(f"Workflow already completed (cached), conclusion: {run_data.get('conclusion')}")
+            return run_data.get('conclusion') == 'success', run_data
+            
         while True:
             try:
-                response = requests.get(url, headers=self.headers)
-                response.raise_for_status()
-                
-                run_data = response.json()
+                run_data = self._conditional_get(url)
                 status = run_data['status']
                 conclusion = run_data.get('conclusion')
                 
                 logger.info(f"Workflow status: {status}, conclusion: {conclusion}")
                 
                 if status == 'completed':
+                    self.cache.set(cache_key, run_data)
                     return conclusion == 'success', run_data
                     
-                time.sleep(30)  # Check every 30 seconds
+                # Back off from 5s to a 60s cap; a webhook can end the wait early
+                delay = min(60, 5 * 1.5 ** min(iteration, 8))
+                iteration += 1
+                
+                # A webhook only cuts the wait short; the run is always re-fetched
+                if self.webhook_url:
+                    if self.webhook_wait(run_id, delay):
+                        logger.info("Workflow completion webhook received, re-checking run status")
+                else:
+                    time.sleep(delay)
                 
             except requests.exceptions.RequestException as e:
                 logger.error(f"Failed to monitor workflow: {e}")
@@ -128,38 +434,105 @@ class CICDAgent:
         if not run_data:
             return "unknown", "No run data available"
             
-        # Get workflow logs
-        logs_url = f"{self.github_api_url}/actions/runs/{run_data['id']}/logs"
-        
+        cache_key = f"{self.github_repo}/runs/{run_data['id']}/analysis"
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached['issue_type'], cached['details']
+            
+        # Only the failed jobs' plain-text logs matter, not the whole run archive
+        issue_type, details = "infrastructure_error", "No failed job logs available"
         try:
-            logs_response = requests.get(logs_url, headers=self.headers)
-            logs_response.raise_for_status()
-            logs = logs_response.text
-            
-            # Analyze logs for failure patterns
-            if "test failure" in logs.lower() or "assertion" in logs.lower():
-                return "test_failure", logs
-            elif "dependency" in logs.lower() or "package" in logs.lower():
-                return "dependency_error", logs
-            elif "configuration" in logs.lower() or "yaml" in logs.lower():
-                return "ci_misconfiguration", logs
-            elif "code" in logs.lower() or "syntax" in logs.lower():
-                return "code_defect", logs
-            else:
-                return "infrastructure_error", logs
-                
+            best_rank = len(self._CATEGORY_PATTERNS)
+            for logs_url in self._failing_job_log_urls(run_data['id']):
+                job_type, job_details = self._scan_failure_logs(logs_url)
+                rank = self._CATEGORY_RANK.get(job_type, len(self._CATEGORY_PATTERNS))
+                if rank < best_rank or (rank == best_rank and issue_type == "infrastructure_error"):
+                    best_rank, issue_type, details = rank, job_type, job_details
+                if rank == 0:
+                    break
         except requests.exceptions.RequestException as e:
             return "unknown", f"Failed to get logs: {e}"
             
+        self.cache.set(cache_key, {'issue_type': issue_type, 'details': details})
+        return issue_type, details
+        
+    def _failing_job_log_urls(self, run_id):
+        """Yield the log URLs of the jobs that failed in a workflow run"""
+        jobs_response = self.session.get(f"{self.github_api_url}/actions/runs/{run_id}/jobs")
+        jobs_response.raise_for_status()
+        
+        for job in json_loads(jobs_response.content)['jobs']:
+            if job.get('conclusion') == 'failure':
+                yield f"{self.github_api_url}/actions/jobs/{job['id']}/logs"
+                
+    def _scan_failure_logs(self, logs_url):
+        """Stream workflow logs and return the highest-priority failure category"""
+        with self.session.get(logs_url, stream=True) as logs_response:
+            logs_response.raise_for_status()
+            return self._classify_log_chunks(logs_response.iter_content(self._LOG_CHUNK_SIZE))
+            
+    def _classify_log_chunks(self, chunks):
+        """Return (category, excerpt) for the highest-priority failure keyword in a chunk stream"""
+        # Carry a small tail so matches spanning chunk boundaries are still found.
+        # When the tail was cut from a longer window, its first byte is only there
+        # as lookbehind context for \b, and a match touching the end of a window
+        # waits for the next chunk, which may extend the word
+        best = None
+        tail = b''
+        pos = 0
+        for chunk in chunks:
+            window = tail + chunk
+            best = self._best_failure_match(window, pos, len(window), best)
+            if best and best[0] == 0:
+                break
+            pos = 1 if len(window) > self._LOG_TAIL_SIZE else 0
+            tail = window[-self._LOG_TAIL_SIZE:]
+        else:
+            best = self._best_failure_match(tail, pos, len(tail) + 1, best)
+            
+        if best:
+            return best[1], best[2]
+        return "infrastructure_error", tail.decode('utf-8', 'replace')
+        
+    def _best_failure_match(self, window, pos, end_limit, best):
+        """Fold matches ending before end_limit into best, a (rank, category, excerpt) tuple"""
+        for match in self._FAILURE_RE.finditer(window, pos):
+            if match.end() >= end_limit:
+                break
+            rank = self._CATEGORY_RANK[match.lastgroup]
+            if best is None or rank < best[0]:
+                best = (rank, *self._failure_excerpt(window, match))
+                if rank == 0:
+                    break
+        return best
+        
+    def _failure_excerpt(self, window, match):
+        """Return the match category and the log text from the start of its line"""
+        line_start = window.rfind(b'\n', 0, match.start()) + 1
+        excerpt = window[line_start:line_start + self._LOG_TAIL_SIZE]
+        return match.lastgroup, excerpt.decode('utf-8', 'replace')
+        
+    def _get_main_sha(self, ttl=300):
+        """Return the main branch head SHA, cached for ttl seconds"""
+        now = time.time()
+        cached = self._sha_cache.get('main')
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+            
+        main_response = self.session.get(f"{self.github_api_url}/git/ref/heads/main")
+        main_response.raise_for_status()
+        main_sha = json_loads(main_response.content)['object']['sha']
+        
+        self._sha_cache['main'] = (now, main_sha)
+        return main_sha
+        
     def create_hotfix_branch(self, environment, issue_type):
         """Create hotfix branch for fixes"""
-        branch_name = f"hotfix/cicd-{environment}-{datetime.now().strftime('%Y%m%d')}"
+        branch_name = f"hotfix/cicd-{environment}-{time.strftime('%Y%m%d')}"
         
         # Get latest commit from main
         try:
-            main_response = requests.get(f"{self.github_api_url}/git/ref/heads/main", headers=self.headers)
-            main_response.raise_for_status()
-            main_sha = main_response.json()['object']['sha']
+            main_sha = self._get_main_sha()
             
             # Create new branch
             branch_payload = {
@@ -167,7 +540,7 @@ class CICDAgent:
                 "sha": main_sha
             }
             
-            branch_response = requests.post(f"{self.github_api_url}/git/refs", headers=self.headers, json=branch_payload)
+            branch_response = self.session.post(f"{self.github_api_url}/git/refs", json=branch_payload)
             branch_response.raise_for_status()
             
             logger.info(f"Created hotfix branch: {branch_name}")
@@ -179,29 +552,16 @@ class CICDAgent:
             
     def create_github_issue(self, environment, issue_type, details):
         """Create GitHub issue for bugs"""
-        title = f"[AutoBug][{environment.upper()}] {issue_type.replace('_', ' ').title()}"
+        env_upper = self._env_upper.get(environment) or environment.upper()
+        issue_label = issue_type.replace('_', ' ').title()
+        title = f"[AutoBug][{env_upper}] {issue_label}"
         
-        body = f"""
-## Environment
-{environment.upper()}
-
-## Issue Type
-{issue_type.replace('_', ' ').title()}
-
-## Root Cause
-{details[:500]}...
-
-## Steps to Reproduce
-1. Trigger deployment to {environment} environment
-2. Monitor workflow execution
-3. Observe failure
-
-## Priority
-Medium
-
-## Labels
-bug, cicd, {environment}
-        """
+        body = ISSUE_TEMPLATE.format_map({
+            'env_upper': env_upper,
+            'env': environment,
+            'issue_type': issue_label,
+            'details': details[:500],
+        })
         
         payload = {
             "title": title,
@@ -210,10 +570,10 @@ bug, cicd, {environment}
         }
         
         try:
-            response = requests.post(f"{self.github_api_url}/issues", headers=self.headers, json=payload)
+            response = self.session.post(f"{self.github_api_url}/issues", json=payload)
             response.raise_for_status()
             
-            issue_data = response.json()
+            issue_data = json_loads(response.content)
             logger.info(f"Created GitHub issue: {issue_data['html_url']}")
             return issue_data['html_url']
             
@@ -268,7 +628,7 @@ bug, cicd, {environment}
         
     def create_final_report(self, failed_environments):
         """Create final failure report"""
-        report_content = f"""
+        header = f"""
 # FINAL FAILURE REPORT - CI/CD Deployment
 
 ## Summary
@@ -277,13 +637,7 @@ Deployment failed for the following environments: {', '.join(failed_environments
 ## Failed Environments
 """
         
-        for env in failed_environments:
-            log_file = f"deployment_log_{env}.md"
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    report_content += f"\n### {env.upper()}\n{f.read()}\n"
-                    
-        report_content += f"""
+        footer = f"""
 ## Recommendations
 1. Review all GitHub issues created during deployment
 2. Check hotfix branches for potential fixes
@@ -297,14 +651,39 @@ Deployment failed for the following environments: {', '.join(failed_environments
 - Check GitHub issues for detailed analysis
 - Consider rolling back recent changes if necessary
 
-Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Generated: {time.strftime("%Y-%m-%d %H:%M:%S")}
         """
         
-        with open("FINAL_FAILURE_REPORT.md", 'w') as f:
-            f.write(report_content)
+        # Stream each environment log straight into the report
+        with open("FINAL_FAILURE_REPORT.md", 'w', buffering=65536) as out:
+            out.write(header)
+            for env in failed_environments:
+                log_file = f"deployment_log_{env}.md"
+                self.flush_deployment_log(env)
+                if os.path.exists(log_file):
+                    out.write(f"\n### {env.upper()}\n")
+                    with open(log_file, 'r') as src:
+                        shutil.copyfileobj(src, out, 65536)
+                    out.write("\n")
+            out.write(footer)
             
         logger.info("Created FINAL_FAILURE_REPORT.md")
         
+    def _wait_between_envs(self, cap=60):
+        """Wait until the deploy workflow can accept a dispatch, for at most cap seconds"""
+        logger.info(f"Waiting up to {cap} seconds for the deploy workflow to be ready...")
+        url = f"{self.github_api_url}/actions/workflows/deploy-all-envs.yml"
+        deadline = time.monotonic() + cap
+        
+        while time.monotonic() < deadline:
+            try:
+                response = self.session.get(url, timeout=3)
+                if response.status_code == 200 and json_loads(response.content).get('state') == 'active':
+                    return
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+            time.sleep(min(2, max(0, deadline - time.monotonic())))
+            
     def run(self):
         """Main deployment orchestration"""
         logger.info("🚀 Starting CI/CD Agent for MangoMetrics NLM")
@@ -312,21 +691,31 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
         
         failed_environments = []
         
-        for environment in self.environments:
-            logger.info(f"\n{'='*50}")
-            logger.info(f"Deploying to {environment.upper()}")
-            logger.info(f"{'='*50}")
-            
-            success = self.deploy_environment(environment)
-            
-            if not success:
-                failed_environments.append(environment)
+        if self.parallel:
+            logger.info("Deploying all environments in parallel")
+            with ThreadPoolExecutor(max_workers=len(self.environments)) as pool:
+                results = list(pool.map(self.deploy_environment, self.environments))
                 
-            # Wait between environments
-            if environment != self.environments[-1]:
-                logger.info("Waiting 60 seconds before next environment...")
-                time.sleep(60)
+            for environment, success in zip(self.environments, results):
+                self.flush_deployment_log(environment)
+                if not success:
+                    failed_environments.append(environment)
+        else:
+            for environment in self.environments:
+                logger.info(f"\n{'='*50}")
+                logger.info(f"Deploying to {environment.upper()}")
+                logger.info(f"{'='*50}")
                 
+                success = self.deploy_environment(environment)
+                self.flush_deployment_log(environment)
+                
+                if not success:
+                    failed_environments.append(environment)
+                    
+                # Wait between environments
+                if environment != self.environments[-1]:
+                    self._wait_between_envs()
+                    
         # Final report if any failures
         if failed_environments:
             logger.error(f"❌ Deployment completed with failures: {', '.join(failed_environments)}")
@@ -337,6 +726,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
         else:
             logger.info("✅ All deployments completed successfully!")
             
+        self.close()
         logger.info("🏁 CI/CD Agent completed")
 
 def main():
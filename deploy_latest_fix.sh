@@ -34,10 +34,27 @@ echo "🌿 Current branch: $CURRENT_BRANCH"
 LATEST_COMMIT=$(git rev-parse HEAD 2>/dev/null || echo "unknown")
 echo "🔗 Latest commit: ${LATEST_COMMIT:0:8}"
 
+# Function to print the newest run ID titled "Deploy to $1", if it is newer than run ID $2
+# (a run's own "id" is the last one listed before its "display_title")
+latest_run_id() {
+    local environment=$1
+    local after=${2:-0}
+    
+    curl -s -H "Authorization: token $GITHUB_TOKEN" \
+        -H "Accept: application/vnd.github.v3+json" \
+        "https://api.github.com/repos/$REPO_NAME/actions/workflows/deploy-all-envs.yml/runs?event=workflow_dispatch&per_page=10" | \
+        grep -oE '"(id|display_title)": *("[^"]*"|[0-9]+)' | \
+        awk -v title="Deploy to $environment" -v after="$after" '
+            /^"id"/ { sub(/^"id": */, ""); id = $0; next }
+            { sub(/^"display_title": *"/, ""); sub(/"$/, "") }
+            $0 == title { if (id + 0 > after + 0) print id; exit }'
+}
+
 # Function to trigger workflow
 trigger_workflow() {
     local environment=$1
     local test_type=$2
+    run_id=""
     
     echo ""
     echo "🚀 Triggering deployment to $environment environment..."
@@ -56,6 +73,10 @@ trigger_workflow() {
 }
 EOF
     
+    # Run IDs increase, so anything newer than this one was created by our dispatch
+    local previous_run_id
+    previous_run_id=$(latest_run_id "$environment")
+    
     # Trigger the workflow
     response=$(curl -s -w "%{http_code}" -X POST \
         -H "Authorization: token $GITHUB_TOKEN" \
@@ -70,18 +91,27 @@ EOF
     if [ "$http_code" = "204" ]; then
         echo "✅ Successfully triggered deployment to $environment"
         
-        # Get the workflow run ID
-        sleep 2
-        runs_response=$(curl -s -H "Authorization: token $GITHUB_TOKEN" \
-            -H "Accept: application/vnd.github.v3+json" \
-            "https://api.github.com/repos/$REPO_NAME/actions/runs?per_page=1")
-        
-        if [ $? -eq 0 ]; then
-            run_id=$(echo "$runs_response" | grep -o '"id":[0-9]*' | head -1 | cut -d':' -f2)
+        # Get the new workflow run ID, retrying with backoff until GitHub lists it
+        local waited=0
+        local delay=1
+        local cap=30
+        while [ $waited -lt $cap ]; do
+            delay=$(( delay < cap - waited ? delay : cap - waited ))
+            sleep $delay
+            waited=$((waited + delay))
+            delay=$((delay * 2))
+            
+            run_id=$(latest_run_id "$environment" "$previous_run_id")
             if [ -n "$run_id" ]; then
-                echo "🔗 Workflow run ID: $run_id"
-                echo "📊 Monitor at: https://github.com/$REPO_NAME/actions/runs/$run_id"
+                break
             fi
+        done
+        
+        if [ -n "$run_id" ]; then
+            echo "🔗 Workflow run ID: $run_id"
+            echo "📊 Monitor at: https://github.com/$REPO_NAME/actions/runs/$run_id"
+        else
+            echo "⚠️ New run for $environment not listed after $cap seconds"
         fi
         
         return 0
@@ -93,6 +123,45 @@ EOF
     fi
 }
 
+# Function to wait until a dispatched run has left the queue, capped at $2 seconds
+wait_for_run_start() {
+    local run_id=$1
+    local cap=${2:-60}
+    local waited=0
+    local delay=1
+    
+    if [ -z "$run_id" ]; then
+        echo "⏳ No run ID available, waiting $cap seconds..."
+        sleep "$cap"
+        return 0
+    fi
+    
+    echo "⏳ Waiting up to $cap seconds for run $run_id to start..."
+    
+    while [ $waited -lt $cap ]; do
+        status_response=$(curl -s -H "Authorization: token $GITHUB_TOKEN" \
+            -H "Accept: application/vnd.github.v3+json" \
+            "https://api.github.com/repos/$REPO_NAME/actions/runs/$run_id")
+        status=$(echo "$status_response" | grep -o '"status":"[^"]*"' | head -1 | cut -d'"' -f4)
+        
+        if [ -n "$status" ] && [ "$status" != "queued" ]; then
+            echo "✅ Run $run_id is $status"
+            return 0
+        fi
+        
+        delay=$(( delay < cap - waited ? delay : cap - waited ))
+        sleep $delay
+        waited=$((waited + delay))
+        delay=$((delay * 2))
+        if [ $delay -gt 8 ]; then
+            delay=8
+        fi
+    done
+    
+    echo "⏰ Run $run_id still queued after $cap seconds, continuing"
+    return 0
+}
+
 # Function to monitor workflow
 monitor_workflow() {
     local run_id=$1
@@ -151,8 +220,8 @@ fi
 
 # Wait before next environment
 echo ""
-echo "⏳ Waiting 60 seconds before QA deployment..."
-sleep 60
+echo "⏳ Waiting for the previous deployment to start before QA..."
+wait_for_run_start "$run_id" 60
 
 # Deploy to QA (functional + integration tests)
 if trigger_workflow "qa" "functional,integration"; then
@@ -164,8 +233,8 @@ fi
 
 # Wait before next environment
 echo ""
-echo "⏳ Waiting 60 seconds before Stage deployment..."
-sleep 60
+echo "⏳ Waiting for the previous deployment to start before Stage..."
+wait_for_run_start "$run_id" 60
 
 # Deploy to Stage (regression + E2E tests)
 if trigger_workflow "stage" "regression,e2e"; then
@@ -21,6 +21,14 @@ else
     echo "3. Optionally set the repository:"
     echo "   export GITHUB_REPOSITORY='MangoMetrics/NLM'"
     echo ""
+    echo "4. Optionally receive workflow_run webhooks instead of polling (secret required):"
+    echo "   export WEBHOOK_URL='https://your-host/webhook'"
+    echo "   export WEBHOOK_PORT=8080"
+    echo "   export WEBHOOK_SECRET='your_webhook_secret'"
+    echo ""
+    echo "5. Optionally deploy all environments in parallel:"
+    echo "   export CICD_PARALLEL=true"
+    echo ""
     echo "You can create a token at: https://github.com/settings/tokens"
 fi
 
@@ -28,6 +36,8 @@ echo ""
 echo "📋 Current Configuration:"
 echo "GITHUB_TOKEN: ${GITHUB_TOKEN:0:10}..."
 echo "GITHUB_REPOSITORY: ${GITHUB_REPOSITORY:-'MangoMetrics/NLM'}"
+echo "WEBHOOK_URL: ${WEBHOOK_URL:-'(not set, polling with backoff)'}"
+echo "CICD_PARALLEL: ${CICD_PARALLEL:-false}"
 echo ""
 
 echo "🔧 To launch the CI/CD agent:"